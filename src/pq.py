@@ -4,9 +4,15 @@ from __future__ import annotations
 from typing import (
     Generic, TypeVar, Protocol,
     Iterable, Iterator, Optional,
-    Any,
+    Any, Callable,
 )
-from dataclasses import dataclass
+import functools
+import heapq
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional and only used for speed
+    np = None
 
 # Defining what it means to be ordered and set up T
 # so we can use it to mean an ordered type
@@ -24,125 +30,596 @@ T = TypeVar('T', bound=Ordered)
 
 
 # Define nodes so we can define trees
-@dataclass
 class Node(Generic[T]):
-    """Inner node in a search tree."""
+    """
+    Inner node in a search tree.
+
+    Nodes know the height of the tree they are the root of, so
+    we can keep trees balanced as AVL trees. The height is computed
+    from the children when the node is created.
+
+    Missing children are the shared NIL node rather than None, so
+    loops over trees only have to test for NIL.
+    """
+
+    __slots__ = ('value', 'left', 'right', 'height')
 
     value: T
-    left: Tree[T] = None
-    right: Tree[T] = None
+    left: Tree[T]
+    right: Tree[T]
+    height: int
+
+    def __init__(
+        self, value: T,
+        left: Optional[Tree[T]] = None,
+        right: Optional[Tree[T]] = None
+    ):
+        """Create a node with the given value and children."""
+        if left is None:
+            left = NIL
+        if right is None:
+            right = NIL
+        self.value = value
+        self.left = left
+        self.right = right
+        hl, hr = left.height, right.height
+        self.height = 1 + (hl if hl > hr else hr)
+
+    def __repr__(self) -> str:
+        """Show the node and its children."""
+        if self is NIL:
+            return "NIL"
+        return f"Node({self.value!r}, {self.left!r}, {self.right!r})"
+
+    def __reduce__(self) -> str | tuple[Any, ...]:
+        """Pickle and copy nodes, keeping NIL the one empty tree."""
+        if self is NIL:
+            return "NIL"
+        return (Node, (self.value, self.left, self.right))
+
+
+Tree = Node[T]
+
+# The empty tree. It is its own children and has height zero, so
+# we can look at the children and heights of empty trees as well.
+# We set it up by hand since the constructor refers to it.
+NIL: Tree[Any] = Node.__new__(Node)
+NIL.value = None
+NIL.left = NIL.right = NIL
+NIL.height = 0
+
+
+# Balancing. All the operations below rebuild nodes through
+# _balance(), which keeps the trees AVL balanced, i.e., the
+# heights of the two children of any node differ by at most one.
+
+
+def _rotate_left(value: T, left: Tree[T], right: Node[T]) -> Node[T]:
+    """Build Node(value, left, right) rotated to the left."""
+    return Node(right.value, Node(value, left, right.left), right.right)
+
+
+def _rotate_right(value: T, left: Node[T], right: Tree[T]) -> Node[T]:
+    """Build Node(value, left, right) rotated to the right."""
+    return Node(left.value, left.left, Node(value, left.right, right))
+
+
+def _balance(value: T, left: Tree[T], right: Tree[T]) -> Node[T]:
+    """
+    Build Node(value, left, right) and rebalance it.
 
+    The children must be balanced, and their heights may differ by
+    at most two, which is what we get after inserting or removing
+    a single value in one of them.
+    """
+    hl, hr = left.height, right.height
+    if hl > hr + 1:
+        if left.left.height < left.right.height:
+            left = _rotate_left(left.value, left.left, left.right)
+        return _rotate_right(value, left, right)
+    if hr > hl + 1:
+        if right.right.height < right.left.height:
+            right = _rotate_right(right.value, right.left, right.right)
+        return _rotate_left(value, left, right)
+    return Node(value, left, right)
+
+# Operations on nodes. Later wrapped for a SearchTree. The public
+# functions also accept None for the empty tree, but always return
+# NIL for it.
+
+
+def contains(tree: Optional[Tree[T]], val: T) -> bool:
+    """Test if val is in this tree."""
+    if tree is None:
+        tree = NIL
+    # We only compare with < on the way down, and remember the last
+    # node where val wasn't smaller. If val is in the tree, it is there.
+    candidate = NIL
+    while tree is not NIL:
+        if val < tree.value:
+            tree = tree.left
+        else:
+            candidate = tree
+            tree = tree.right
+    return candidate is not NIL and not candidate.value < val
 
-Tree = Optional[Node[T]]
 
-# Operations on nodes. Later wrapped for a SearchTree
+Path = list[tuple[Node[T], bool]]
 
 
-def contains(tree: Tree[T], val: T) -> bool:
-    """Insert val into this tree."""
-    if tree is None:
-        return False
-    if val < tree.value:
-        return contains(tree.left, val)
-    if val > tree.value:
-        return contains(tree.right, val)
-    return True
+def _search(tree: Tree[T], val: T) -> tuple[Path[T], int]:
+    """
+    Find the path from the root to where val is or would be inserted.
 
+    Like contains(), we compare with < once per level all the way
+    down. We return the path together with the index of the node
+    on it that holds val, or -1 if val isn't in the tree. If val is
+    there, the path continues to the leftmost node in its right
+    subtree, or ends in val's node if that has no right subtree.
+    """
+    path: Path[T] = []
+    candidate = -1
+    while tree is not NIL:
+        if val < tree.value:
+            path.append((tree, True))
+            tree = tree.left
+        else:
+            candidate = len(path)
+            path.append((tree, False))
+            tree = tree.right
+    if candidate >= 0 and path[candidate][0].value < val:
+        candidate = -1
+    return path, candidate
 
-def insert(tree: Tree[T], val: T) -> Node[T]:
+
+def _rebuild(path: Path[T], tree: Tree[T]) -> Tree[T]:
+    """
+    Rebuild the nodes on path on top of a new subtree.
+
+    The path is a list of (node, went_left) pairs from the root
+    and down, and tree replaces the subtree we ended in. The nodes
+    on the path are copied and rebalanced, so the original tree is
+    left unchanged.
+    """
+    for parent, went_left in reversed(path):
+        if went_left:
+            tree = _balance(parent.value, tree, parent.right)
+        else:
+            tree = _balance(parent.value, parent.left, tree)
+    return tree
+
+
+def insert(tree: Optional[Tree[T]], val: T) -> Node[T]:
     """Insert val into this tree."""
     if tree is None:
-        return Node(val)
-    if val < tree.value:
-        return Node(tree.value, insert(tree.left, val), tree.right)
-    if val > tree.value:
-        return Node(tree.value, tree.left, insert(tree.right, val))
-    return tree
+        tree = NIL
+    path, found = _search(tree, val)
+    if found >= 0:
+        # val is already in the tree, so it doesn't change
+        return tree
+    return _rebuild(path, Node(val))
 
 
-def rightmost(tree: Node[T]) -> T:
+def rightmost(tree: Optional[Tree[T]]) -> T:
     """Get the rightmost value in a non-empty tree."""
-    while tree.right:
+    if tree is None or tree is NIL:
+        raise IndexError("rightmost value of an empty tree")
+    while tree.right is not NIL:
         tree = tree.right
     return tree.value
 
-def leftmost(tree: Node[T]) -> T: 
+def leftmost(tree: Optional[Tree[T]]) -> T:
     """Get the leftmost value in a non-empty tree"""
-    while tree.left:
+    if tree is None or tree is NIL:
+        raise IndexError("leftmost value of an empty tree")
+    while tree.left is not NIL:
         tree = tree.left
     return tree.value
 
 
-def remove(tree: Tree[T], val: T) -> Tree[T]:
+def delete_leftmost(tree: Optional[Tree[T]]) -> tuple[T, Tree[T]]:
+    """
+    Remove the leftmost value from a non-empty tree.
+
+    Returns the value together with the new tree, and finds both
+    in a single walk down the left spine.
+    """
+    if tree is None or tree is NIL:
+        raise IndexError("delete from an empty tree")
+    path: Path[T] = []
+    while tree.left is not NIL:
+        path.append((tree, True))
+        tree = tree.left
+    return tree.value, _rebuild(path, tree.right)
+
+
+def remove(tree: Optional[Tree[T]], val: T) -> Tree[T]:
     """Remove val from tree."""
     if tree is None:
-        return None
+        tree = NIL
+    path, found = _search(tree, val)
+    if found < 0:
+        # val isn't in the tree, so it doesn't change
+        return tree
+
+    last, _ = path.pop()
+    if len(path) == found:
+        # val's node has no right subtree, so its left replaces it
+        return _rebuild(path, last.left)
+
+    # Replace val with the leftmost value in its right subtree,
+    # which is in the last node on the path
+    node = path[found][0]
+    right = _rebuild(path[found + 1:], last.right)
+    return _rebuild(path[:found], _balance(last.value, node.left, right))
+
+
+def join(left: Optional[Tree[T]], right: Optional[Tree[T]]) -> Tree[T]:
+    """
+    Join two trees where all values in left are smaller than all in right.
+
+    We take the smallest value in right out as a new root and hang it
+    on the spine of the taller tree, where the heights match, so we
+    only rebuild O(log n) nodes. The input trees are left unchanged.
+    """
+    if left is None:
+        left = NIL
+    if right is None:
+        right = NIL
+    if left is NIL:
+        return right
+    if right is NIL:
+        return left
+    val, right = delete_leftmost(right)
+
+    # At most one of these loops runs, walking down the spine of the
+    # taller tree until the heights are within one of each other
+    path: Path[T] = []
+    while left.height > right.height + 1:
+        path.append((left, False))
+        left = left.right
+    while right.height > left.height + 1:
+        path.append((right, True))
+        right = right.left
+    return _rebuild(path, Node(val, left, right))
+
+
+# In-place versions of the updates. These modify the nodes instead
+# of copying them, so they are only safe on trees that don't share
+# nodes with any other tree. SearchTree keeps track of when that is.
+
+
+def _update_height(node: Node[T]) -> None:
+    """Recompute the height of node from its children."""
+    hl, hr = node.left.height, node.right.height
+    node.height = 1 + (hl if hl > hr else hr)
+
+
+def _rotate_left_mut(node: Node[T]) -> Node[T]:
+    """Rotate node to the left in place and return the new root."""
+    right = node.right
+    node.right = right.left
+    right.left = node
+    _update_height(node)
+    _update_height(right)
+    return right
+
+
+def _rotate_right_mut(node: Node[T]) -> Node[T]:
+    """Rotate node to the right in place and return the new root."""
+    left = node.left
+    node.left = left.right
+    left.right = node
+    _update_height(node)
+    _update_height(left)
+    return left
+
+
+def _fix(node: Node[T]) -> Node[T]:
+    """
+    Update the height of node and rebalance it in place.
+
+    This is the in-place version of _balance(). It returns the new
+    root of the subtree, which is node unless we had to rotate it.
+    """
+    left, right = node.left, node.right
+    hl, hr = left.height, right.height
+    if hl > hr + 1:
+        if left.left.height < left.right.height:
+            node.left = _rotate_left_mut(left)
+        return _rotate_right_mut(node)
+    if hr > hl + 1:
+        if right.right.height < right.left.height:
+            node.right = _rotate_right_mut(right)
+        return _rotate_left_mut(node)
+    node.height = 1 + (hl if hl > hr else hr)
+    return node
+
+
+def _relink(path: Path[T], tree: Tree[T]) -> Tree[T]:
+    """
+    Hang a new subtree at the end of path, and rebalance, in place.
+
+    This is the in-place version of _rebuild(), and we return the
+    new root of the whole tree.
+    """
+    for parent, went_left in reversed(path):
+        if went_left:
+            parent.left = tree
+        else:
+            parent.right = tree
+        tree = _fix(parent)
+    return tree
 
-    if val < tree.value:
-        return Node(tree.value, remove(tree.left, val), tree.right)
-    if val > tree.value:
-        return Node(tree.value, tree.left, remove(tree.right, val))
 
-    # tree.value == val
-    if tree.left is None:
-        return tree.right
-    if tree.right is None:
-        return tree.left
+def _insert_mut(tree: Tree[T], val: T) -> Node[T]:
+    """Insert val into this tree in place."""
+    path, found = _search(tree, val)
+    if found >= 0:
+        return tree
+    return _relink(path, Node(val))
 
-    rm_val = rightmost(tree.left)
-    return Node(rm_val, remove(tree.left, rm_val), tree.right)
 
+def _delete_leftmost_mut(tree: Node[T]) -> tuple[T, Tree[T]]:
+    """Remove the leftmost value from a non-empty tree in place."""
+    if tree is NIL:
+        raise IndexError("delete from an empty tree")
+    path: Path[T] = []
+    while tree.left is not NIL:
+        path.append((tree, True))
+        tree = tree.left
+    return tree.value, _relink(path, tree.right)
 
-def iterate(tree: Tree[T]) -> Iterator[T]:
+
+def _remove_mut(tree: Tree[T], val: T) -> Tree[T]:
+    """Remove val from tree in place."""
+    path, found = _search(tree, val)
+    if found < 0:
+        return tree
+
+    last, _ = path.pop()
+    if len(path) == found:
+        return _relink(path, last.left)
+
+    # Move the leftmost value in the right subtree up into val's node
+    path[found][0].value = last.value
+    return _relink(path, last.right)
+
+
+def _from_sorted(a: list[T], lo: int, hi: int) -> Tree[T]:
+    """
+    Build a balanced tree from the sorted values a[lo:hi].
+
+    The values must be strictly increasing. The middle value goes
+    in the root, so the tree has height O(log n) and we build it in
+    O(n).
+    """
+    if hi - lo <= _SMALL_TREE:
+        return _make_builder(hi - lo)(a, lo)
+    m = (lo + hi) // 2
+    return Node(a[m], _from_sorted(a, lo, m), _from_sorted(a, m + 1, hi))
+
+
+# Trees up to this size are built by generated straight-line code
+_SMALL_TREE = 16
+
+
+@functools.lru_cache(maxsize=None)
+def _make_builder(n: int) -> Callable[[list[T], int], Tree[T]]:
+    """
+    Generate a function that builds a balanced tree of size n.
+
+    The function takes a sorted list a and an offset lo and builds
+    the same tree as _from_sorted(a, lo, lo + n), but as a single
+    expression with the indices worked out in advance, so it makes
+    no recursive calls or comparisons.
+    """
+    def build(lo: int, hi: int) -> str:
+        """Write the expression for the tree over a[lo:hi]."""
+        if lo >= hi:
+            return "NIL"
+        m = (lo + hi) // 2
+        return f"Node(a[lo + {m}], {build(lo, m)}, {build(m + 1, hi)})"
+
+    src = f"def builder(a, lo):\n    return {build(0, n)}\n"
+    namespace: dict[str, Any] = {"Node": Node, "NIL": NIL}
+    exec(src, namespace)
+    return namespace["builder"]
+
+
+def _unique(x: Iterable[T]) -> list[T]:
+    """Get the values of a sorted iterable with duplicates removed."""
+    a: list[T] = []
+    for v in x:
+        if not a or a[-1] < v:
+            a.append(v)
+    return a
+
+
+# Below this many values, checking the types costs more than numpy saves
+_NUMPY_MIN_SIZE = 1000
+
+
+def _sorted_unique(x: Iterable[T]) -> list[T]:
+    """
+    Sort the values in x and remove duplicates.
+
+    If numpy is installed and x holds many plain ints, we let numpy
+    sort them as 64-bit integers, which doesn't go through Python
+    comparisons. Everything else is sorted with sorted().
+    """
+    a = list(x)
+    if (np is not None and len(a) >= _NUMPY_MIN_SIZE
+            and all(type(v) is int for v in a)):
+        try:
+            arr = np.array(a, dtype=np.int64)
+        except OverflowError:
+            pass  # Too large for int64
+        else:
+            arr.sort()
+            keep = np.empty(len(arr), dtype=bool)
+            keep[0] = True
+            np.not_equal(arr[1:], arr[:-1], out=keep[1:])
+            return arr[keep].tolist()
+    return _unique(sorted(a))
+
+
+def iterate(tree: Optional[Tree[T]]) -> Iterator[T]:
     """Iterate over all the tree's values."""
-    if tree is not None:
-        yield from iterate(tree.left)
+    if tree is None:
+        tree = NIL
+    stack: list[Node[T]] = []
+    while stack or tree is not NIL:
+        while tree is not NIL:
+            stack.append(tree)
+            tree = tree.left
+        tree = stack.pop()
         yield tree.value
-        yield from iterate(tree.right)
+        tree = tree.right
 
 # Interface to a search tree
 
 
-@dataclass(init=False)
+ST = TypeVar('ST', bound='SearchTree[Any]')
+
+
 class SearchTree(Generic[T]):
-    """A search tree."""
+    """
+    A search tree.
+
+    If the tree's nodes are not shared with any other tree, we
+    update them in place instead of copying them. The `_owned`
+    attribute tracks this; it is only true for trees we built
+    from scratch and have only updated in place since. Once the
+    root has been handed out through the `root` property, we can't
+    know who else holds on to the nodes, so from then on we update
+    the tree persistently, as we do for trees built from an
+    existing Tree, or copied with copy.copy().
+    """
 
-    root: Tree[T]
+    _root: Tree[T]
+    _owned: bool
 
-    def __init__(self, data: Iterable[T] = (), tree: Tree[T] = None):
+    def __init__(
+        self, data: Iterable[T] = (), tree: Optional[Tree[T]] = None
+    ):
         """
         Build a search tree from data.
 
-        We build it by inserting nodes one at a time,
-        so the construction time is O(n log n) if data has n elements.
+        We sort the data and build a balanced tree from the sorted
+        values, so the construction time is O(n log n) if data has
+        n elements, and the tree has height O(log n).
 
         If you provide a tree to the `tree` argument, it is used
         as the initial tree. This gives you a way of constructing
-        a SearchTree object from a Tree object.
+        a SearchTree object from a Tree object. The elements in data
+        are then inserted into it one at a time.
         """
-        self.root = tree
+        if tree is None:
+            a = _sorted_unique(data)
+            self._root = _from_sorted(a, 0, len(a))
+            self._owned = True
+            return
+        self._root = tree
+        self._owned = False
         for x in data:
             self.insert(x)
 
+    @classmethod
+    def _adopt(cls: type[ST], tree: Tree[Any]) -> ST:
+        """Wrap a tree that we just built and no other tree shares."""
+        new = cls()
+        new._root = tree
+        return new
+
+    @property
+    def root(self) -> Tree[T]:
+        """Get the root of the tree."""
+        # Whoever gets the root might keep it, so we must stop
+        # modifying the nodes
+        self._owned = False
+        return self._root
+
+    @root.setter
+    def root(self, tree: Tree[T]) -> None:
+        """Replace the tree."""
+        self._root = tree
+        self._owned = False
+
+    def __repr__(self) -> str:
+        """Show the tree."""
+        return f"{type(self).__name__}(root={self._root!r})"
+
+    def __copy__(self) -> SearchTree[T]:
+        """Make a copy that shares the nodes with this tree."""
+        # Now two trees see the nodes, so neither may modify them
+        new = type(self).__new__(type(self))
+        new._root = self._root
+        new._owned = self._owned = False
+        return new
+
     def __contains__(self, val: T) -> bool:
         """Test if val is in this tree."""
-        return contains(self.root, val)
+        return contains(self._root, val)
 
     def insert(self, val: T) -> None:
         """Insert val into this tree."""
-        self.root = insert(self.root, val)
+        if self._owned:
+            self._root = _insert_mut(self._root, val)
+        else:
+            self._root = insert(self._root, val)
 
     def remove(self, val: T) -> None:
         """Remove val from this tree."""
-        self.root = remove(self.root, val)
+        if self._owned:
+            self._root = _remove_mut(self._root, val)
+        else:
+            self._root = remove(self._root, val)
+
+    def clear(self) -> None:
+        """Remove all values from this tree."""
+        self._root = NIL
+        self._owned = True
 
     def __iter__(self) -> Iterator[T]:
-        """Iterate over all the tree's values."""
-        yield from iterate(self.root)
+        """
+        Iterate over all the tree's values.
+
+        We iterate over a snapshot of the values, so updating the
+        tree while iterating doesn't change what the iterator sees,
+        even when the update happens in place.
+        """
+        return iter(self.as_list())
+
+    def as_list(self) -> list[T]:
+        """
+        Get all the tree's values in a sorted list.
+
+        This is the same traversal as iterate() but collects the
+        values in a list instead of yielding them one at a time.
+        """
+        out: list[T] = []
+        stack: list[Node[T]] = []
+        node = self._root
+        while True:
+            while node is not NIL:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                return out
+            node = stack.pop()
+            out.append(node.value)
+            node = node.right
 
     def __bool__(self) -> bool:
         """Test for emptiness as a bool."""
-        return self.root is not None
+        return self._root is not NIL
+
+    def __eq__(self, other: object) -> bool:
+        """Test if two trees hold the same values."""
+        if not isinstance(other, SearchTree):
+            return NotImplemented
+        return self.as_list() == other.as_list()
 
 
 def st_sort(x: Iterable[T]) -> Iterator[T]:
@@ -152,7 +629,7 @@ def st_sort(x: Iterable[T]) -> Iterator[T]:
     We can do this by simply inserting all the elements
     into a search tree and then run through it in-order.
     """
-    return iter(SearchTree(x))
+    return iter(SearchTree(x).as_list())
 
 # And now for the priority queue
 
@@ -163,12 +640,14 @@ class PriorityQueue(SearchTree[T]):
     @property
     def min_val(self) -> T:
         """Return the smallest value."""
-        return leftmost(self.root)
+        return leftmost(self._root)
 
     def delete_min(self) -> T:
         """Delete the smallest value (and return it)."""
-        minimum = self.min_val
-        self.remove(minimum)
+        if self._owned:
+            minimum, self._root = _delete_leftmost_mut(self._root)
+        else:
+            minimum, self._root = delete_leftmost(self._root)
         return minimum
 
 
@@ -176,11 +655,10 @@ def pq_sort(x: Iterable[T]) -> Iterator[T]:
     """Sort x using a priority queue."""
     sorted = []
     pq = PriorityQueue(x)
-    while pq.root:
+    while pq:
         sorted.append(pq.delete_min())
     return sorted
 
-    
 
 
 # Merging
@@ -194,8 +672,10 @@ def general_merge(
     unchanged, but the implementation above does allow for it
     in the same running time.
     """
-    while y.root:
-        x.insert(y.delete_min())
+    merged = _unique(heapq.merge(x.as_list(), y.as_list()))
+    x._root = _from_sorted(merged, 0, len(merged))
+    x._owned = True
+    y.clear()
     return x
 
 def general_merge_persistent(
@@ -208,22 +688,65 @@ def general_merge_persistent(
     unchanged, but the implementation above does allow for it
     in the same running time.
     """
-    
-    pq1 = pq_sort(x)
-    pq2 = pq_sort(y)
+    merged = _unique(heapq.merge(x.as_list(), y.as_list()))
+    return PriorityQueue._adopt(_from_sorted(merged, 0, len(merged)))
+
+def kway_merge(pqs: list[PriorityQueue[T]]) -> PriorityQueue[T]:
+    """
+    Merge any number of priority queues into a new priority queue.
 
-    merged = []
-    i, j = 0, 0 
-    while i<len(pq1) and j<len(pq2):
-        if pq1[i] < pq2[j]:
-            merged.append(pq1[i])
-            i += 1
+    We merge the queues' values in sorted order with a loser tree,
+    so for k queues we use log2(k) comparisons per value rather
+    than the up to 2 log2(k) of a heap. The queues are left
+    unchanged.
+    """
+    runs = [pq.as_list() for pq in pqs if pq]
+    k = len(runs)
+    if k == 0:
+        return PriorityQueue()
+
+    heads = [run[0] for run in runs]
+    pos = [0] * k
+    done = [False] * k
+
+    def before(i: int, j: int) -> bool:
+        """Test if the head of run i comes before the head of run j."""
+        if done[i] or done[j]:
+            return done[j]
+        return heads[i] < heads[j]
+
+    # Leaf i sits at index k + i and inner node n has children 2n and
+    # 2n+1. Each inner node remembers the loser of its match, and the
+    # overall winner comes out at the top.
+    winners = [0] * k + list(range(k))
+    losers = [0] * k
+    for n in range(k - 1, 0, -1):
+        a, b = winners[2 * n], winners[2 * n + 1]
+        if before(a, b):
+            winners[n], losers[n] = a, b
+        else:
+            winners[n], losers[n] = b, a
+    winner = winners[1]
+
+    merged: list[T] = []
+    while not done[winner]:
+        v = heads[winner]
+        if not merged or merged[-1] < v:
+            merged.append(v)
+        pos[winner] += 1
+        if pos[winner] < len(runs[winner]):
+            heads[winner] = runs[winner][pos[winner]]
         else:
-            merged.append(pq2[j])
-            j += 1
-    merged.extend(pq1[i:])
-    merged.extend(pq2[j:])
-    return PriorityQueue(merged)
+            done[winner] = True
+        # Replay the matches on the path from the winner's leaf
+        n = (k + winner) // 2
+        while n:
+            if before(losers[n], winner):
+                losers[n], winner = winner, losers[n]
+            n //= 2
+
+    return PriorityQueue._adopt(_from_sorted(merged, 0, len(merged)))
+
 
 def special_merge(
     x: PriorityQueue[T], y: PriorityQueue[T]
@@ -238,17 +761,15 @@ def special_merge(
     unchanged, but the implementation above does allow for it
     in the same running time.
     """
-    largest_x = rightmost(x.root)
+    largest_x = rightmost(x._root)
     smallest_y = y.min_val
     assert largest_x < smallest_y
-    
-    #If we always insert to value to the right in the smallest tree 
-    tree = x.root
-    while tree.right:
-        tree = tree.right #start at the rightmost node
-    while y.root:
-        tree.right = Node(y.delete_min())
-        tree = tree.right
+
+    # The joined tree shares nodes with y's tree, so it is only ours
+    # to modify if y's tree was
+    x._root = join(x._root, y._root)
+    x._owned = x._owned and y._owned
+    y.clear()
     return x
 
 def special_merge_persistent(
@@ -264,11 +785,10 @@ def special_merge_persistent(
     unchanged, but the implementation above does allow for it
     in the same running time.
     """
-    largest_x = rightmost(x.root)
+    largest_x = rightmost(x._root)
     smallest_y = y.min_val
     assert largest_x < smallest_y
 
-    pq1 = pq_sort(x)
-    pq2 = pq_sort(y)
-    merged = pq1 + pq2
-    return PriorityQueue(merged)
\ No newline at end of file
+    # The new queue shares nodes with both x and y, and getting their
+    # roots stops them from modifying those nodes
+    return PriorityQueue(tree=join(x.root, y.root))
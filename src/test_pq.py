@@ -1,14 +1,22 @@
 """Testing the search-tree based priority queue."""
 
 from pq import (
-    PriorityQueue,
+    NIL, contains, insert, remove, iterate,
+    SearchTree, PriorityQueue,
     st_sort, pq_sort,
     general_merge,
     general_merge_persistent,
+    kway_merge,
     special_merge, 
     special_merge_persistent
 )
+import pq as pq_module
 from itertools import permutations
+import copy
+import pickle
+import pytest
+import random
+from typing import Any
 
 
 def test_search_tree_sort() -> None:
@@ -23,6 +31,180 @@ def test_search_tree_sort() -> None:
         assert x == tuple(st_sort(y))
 
 
+def test_search_tree_operations() -> None:
+    """Test membership, insertion and removal in a search tree."""
+    x = tuple(range(5))
+    for y in permutations(x):
+        tree = SearchTree(y)
+        for v in x:
+            assert v in tree
+            tree.remove(v)
+            assert v not in tree
+            assert tuple(tree) == x[v + 1:]
+        assert not tree
+
+
+def test_shared_tree_unchanged() -> None:
+    """Test that updating a tree built from another tree leaves it alone."""
+    x = tuple(range(10))
+    original = SearchTree(x)
+    copy = SearchTree(tree=original.root)
+    for v in x[::2]:
+        copy.remove(v)
+    copy.insert(10)
+    assert tuple(original) == x
+    assert tuple(copy) == x[1::2] + (10,)
+
+
+def test_shared_tree_unchanged_by_original() -> None:
+    """Test that updating a tree leaves trees built from its root alone."""
+    x = tuple(range(10))
+    original = SearchTree(x)
+    copy = SearchTree(tree=original.root)
+    for v in x[::2]:
+        original.remove(v)
+    original.insert(-1)
+    assert tuple(copy) == x
+    assert tuple(original) == (-1,) + x[1::2]
+
+
+def test_update_while_iterating() -> None:
+    """Test that iterators see the tree as it was when they started."""
+    tree = SearchTree(range(10))
+    seen = []
+    for v in tree:
+        seen.append(v)
+        tree.remove(v)
+    assert seen == list(range(10))
+    assert not tree
+
+    pq = PriorityQueue(range(10))
+    it = iter(pq)
+    assert next(it) == 0
+    pq.delete_min()
+    pq.delete_min()
+    pq.insert(100)
+    assert list(it) == list(range(1, 10))
+    assert list(pq) == list(range(2, 10)) + [100]
+
+
+def test_copy_unchanged_by_original() -> None:
+    """Test that copies and originals don't change each other."""
+    a = SearchTree(range(10))
+    b = copy.copy(a)
+    b.remove(5)
+    a.insert(10)
+    assert list(a) == list(range(11))
+    assert list(b) == [0, 1, 2, 3, 4, 6, 7, 8, 9]
+
+
+def test_deep_copy_and_pickle() -> None:
+    """Test that deep copies and pickled trees still work as trees."""
+    a = SearchTree(range(10))
+    for b in (copy.deepcopy(a), pickle.loads(pickle.dumps(a))):
+        b.insert(10)
+        b.remove(3)
+        assert list(b) == [0, 1, 2, 4, 5, 6, 7, 8, 9, 10]
+        assert 3 not in b
+    assert list(a) == list(range(10))
+    assert copy.deepcopy(NIL) is NIL
+
+
+def test_merged_queue_unchanged_by_inputs() -> None:
+    """Test that updating the inputs leaves a persistent merge alone."""
+    x = PriorityQueue(range(5))
+    y = PriorityQueue(range(5, 10))
+    z = special_merge_persistent(x, y)
+    x.remove(2)
+    x.insert(-1)
+    y.remove(7)
+    y.delete_min()
+    assert tuple(z) == tuple(range(10))
+    assert tuple(x) == (-1, 0, 1, 3, 4)
+    assert tuple(y) == (6, 8, 9)
+
+
+def test_none_is_empty_tree() -> None:
+    """Test that the tree functions accept None as the empty tree."""
+    assert not contains(None, 1)
+    assert remove(None, 1) is NIL
+    assert () == tuple(iterate(None))
+    tree = insert(None, 1)
+    assert contains(tree, 1)
+    assert remove(tree, 1) is NIL
+
+
+def check_balanced(tree: Any) -> int:
+    """Check the heights and AVL balance of tree and return its height."""
+    if tree is NIL:
+        assert tree.height == 0
+        return 0
+    hl, hr = check_balanced(tree.left), check_balanced(tree.right)
+    assert abs(hl - hr) <= 1
+    assert tree.height == 1 + max(hl, hr)
+    return tree.height
+
+
+def test_balanced() -> None:
+    """Test that trees stay balanced when we insert and remove in order."""
+    n = 200
+    persistent: Any = NIL
+    for v in range(n):
+        persistent = insert(persistent, v)
+        check_balanced(persistent)
+    assert tuple(iterate(persistent)) == tuple(range(n))
+    # An AVL tree with n nodes has height below 1.45 log2(n)
+    assert persistent.height <= 11
+    for v in range(0, n, 2):
+        persistent = remove(persistent, v)
+        check_balanced(persistent)
+    assert tuple(iterate(persistent)) == tuple(range(1, n, 2))
+
+    # Getting the root stops in-place updates, so we only check the
+    # in-place trees when we are done with them
+    in_place = SearchTree[int]()
+    for v in range(n):
+        in_place.insert(v)
+    for v in range(0, n, 2):
+        in_place.remove(v)
+    assert tuple(in_place) == tuple(range(1, n, 2))
+    assert check_balanced(in_place.root) <= 11
+    pq = PriorityQueue(range(n))
+    for _ in range(n // 2):
+        pq.delete_min()
+    check_balanced(pq.root)
+
+
+def test_balanced_random_order() -> None:
+    """Test balance when we insert and remove values in random order."""
+    n = 200
+    rng = random.Random(2022)
+    for _ in range(20):
+        order = rng.sample(range(n), n)
+        persistent: Any = NIL
+        in_place = SearchTree[int]()
+        for v in order:
+            persistent = insert(persistent, v)
+            in_place.insert(v)
+            check_balanced(persistent)
+        for v in order[::2]:
+            persistent = remove(persistent, v)
+            in_place.remove(v)
+            check_balanced(persistent)
+        assert tuple(in_place) == tuple(iterate(persistent))
+        check_balanced(in_place.root)
+
+
+def test_search_tree_equality() -> None:
+    """Test that trees with the same values are equal."""
+    x = tuple(range(5))
+    for y in permutations(x):
+        assert SearchTree(x) == SearchTree(y)
+        assert SearchTree(tree=SearchTree(y).root) == SearchTree(x)
+    assert SearchTree(x) != SearchTree(x[1:])
+    assert SearchTree() == SearchTree()
+
+
 def test_pq_sort() -> None:
     """
     Test that we can extract elements in sorted order.
@@ -36,6 +218,50 @@ def test_pq_sort() -> None:
         assert x == tuple(pq_sort(y))
 
 
+def test_delete_min() -> None:
+    """Test that delete_min removes values in increasing order."""
+    x = tuple(range(5))
+    for y in permutations(x):
+        pq = PriorityQueue(y)
+        for v in x:
+            assert pq.min_val == v
+            assert pq.delete_min() == v
+        assert not pq
+    with pytest.raises(IndexError):
+        pq.min_val
+    with pytest.raises(IndexError):
+        pq.delete_min()
+    with pytest.raises(IndexError):
+        PriorityQueue(tree=pq.root).delete_min()
+
+
+def test_sort_many_ints(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test sorting enough ints with duplicates to go through numpy."""
+    pytest.importorskip("numpy")
+    data = [v % 700 for v in range(2100, 0, -1)]
+    result = pq_sort(data)
+    assert result == list(range(700))
+    assert all(type(v) is int for v in result)
+    assert list(range(700)) == list(st_sort(data))
+    monkeypatch.setattr(pq_module, "np", None)
+    assert result == pq_sort(data)
+
+
+def test_sort_many_huge_ints() -> None:
+    """Test sorting many ints where some don't fit in 64 bits."""
+    data = [2**64, 2**63, *range(1000), *range(1000), -2**63 - 1]
+    expected = [-2**63 - 1, *range(1000), 2**63, 2**64]
+    assert expected == pq_sort(data)
+
+
+def test_sort_many_mixed_numbers() -> None:
+    """Test sorting many values mixing ints and floats."""
+    data = [*range(1000), 0.5, 999.5, *range(500)]
+    result = pq_sort(data)
+    assert [0, 0.5, *range(1, 1000), 999.5] == result
+    assert type(result[1]) is float
+
+
 def test_merge() -> None:
     """Test that we can merge priority queues."""
     data = tuple(range(10))
@@ -45,6 +271,28 @@ def test_merge() -> None:
     x = PriorityQueue(data[:5])
     y = PriorityQueue(data[5:])
     assert data == tuple(iter(special_merge(x, y)))
+    with pytest.raises(IndexError):
+        special_merge(PriorityQueue(), PriorityQueue(data))
+    with pytest.raises(IndexError):
+        special_merge_persistent(PriorityQueue(data), PriorityQueue())
+
+
+def test_kway_merge() -> None:
+    """Test that we can merge many priority queues at once."""
+    data = tuple(range(20))
+    for k in range(1, 8):
+        pqs = [PriorityQueue(data[i::k]) for i in range(k)]
+        pqs.append(PriorityQueue(data[::3]))
+        assert data == tuple(iter(kway_merge(pqs)))
+        assert tuple(iter(pqs[0])) == data[::k]
+        merged = kway_merge(pqs)
+        merged.remove(3)
+        merged.insert(-1)
+        assert merged.delete_min() == -1
+        assert tuple(merged) == data[:3] + data[4:]
+    assert () == tuple(iter(kway_merge([])))
+    assert () == tuple(iter(kway_merge([PriorityQueue()] * 3)))
+
 
 def test_merge_persistent() -> None: 
     data = tuple(range(10))
@@ -52,3 +300,11 @@ def test_merge_persistent() -> None:
     y = PriorityQueue(data[5:])
     assert data == tuple(iter(general_merge_persistent(x,y)))
     assert data == tuple(iter(special_merge_persistent(x,y)))
+    assert data[:5] == tuple(iter(x))
+    assert data[5:] == tuple(iter(y))
+    for i in range(len(data)):
+        x = PriorityQueue(data[:i])
+        y = PriorityQueue(data[i:])
+        if x and y:
+            assert data == tuple(iter(special_merge_persistent(x, y)))
+            assert data == tuple(iter(special_merge(x, y)))